@@ -0,0 +1,87 @@
+"""
+Quick Answers Builder
+Run this once (offline) to precompute AI answers for the sidebar quick questions
+"""
+
+import asyncio
+import json
+import os
+from groq import AsyncGroq
+from config.secrets_manager import GROQ_API_KEY
+from utils.ai_assistant import (
+    get_ai_response_async,
+    FALLBACK_MESSAGES,
+    LANGUAGES,
+    QUICK_QUESTIONS,
+    QUICK_ANSWERS_FILE
+)
+from utils.budget import fetch_countries
+
+# Maximum number of Groq requests in flight at once
+MAX_CONCURRENT_REQUESTS = 8
+
+
+def save_answers(answers: dict):
+    """Write answers to the quick answers file"""
+    os.makedirs(os.path.dirname(QUICK_ANSWERS_FILE), exist_ok=True)
+    with open(QUICK_ANSWERS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(answers, f, ensure_ascii=False)
+
+
+async def build_answers(answers: dict, countries: list):
+    """Fill in missing answers, one country at a time"""
+    fallback_responses = set(FALLBACK_MESSAGES.values())
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async with AsyncGroq(api_key=GROQ_API_KEY, timeout=30.0) as client:
+
+        async def answer(country: str, language: str, question: str):
+            async with semaphore:
+                response = await get_ai_response_async(
+                    client, question, country=country or None, language=language
+                )
+
+            # Never store the "AI unavailable" message as an answer
+            if response and response not in fallback_responses:
+                answers[country][language][question] = response
+
+        for country in countries:
+            pending = []
+            for language in LANGUAGES:
+                country_answers = answers.setdefault(country, {}).setdefault(language, {})
+                pending += [
+                    answer(country, language, question)
+                    for question in QUICK_QUESTIONS
+                    if question not in country_answers
+                ]
+
+            await asyncio.gather(*pending)
+
+            # Save after each country so an interrupted run can resume
+            save_answers(answers)
+            print(f"✅ {country or 'General Travel'}")
+
+
+if not GROQ_API_KEY:
+    print("❌ GROQ_API_KEY is not set. Add it to your .env file first.")
+    raise SystemExit(1)
+
+# Keep answers from a previous (possibly interrupted) run
+if os.path.exists(QUICK_ANSWERS_FILE):
+    with open(QUICK_ANSWERS_FILE, 'r', encoding='utf-8') as f:
+        answers = json.load(f)
+else:
+    answers = {}
+
+# "" is the general travel context (no country selected)
+countries = [""] + [c["name"] for c in fetch_countries()]
+
+print("=" * 60)
+print("🤖 Building quick answers")
+print(f"   {len(countries)} contexts × {len(LANGUAGES)} languages × {len(QUICK_QUESTIONS)} questions")
+print("=" * 60)
+
+asyncio.run(build_answers(answers, countries))
+
+print("=" * 60)
+print(f"Saved to {QUICK_ANSWERS_FILE}")
@@ -5,9 +5,93 @@ Professional multilingual AI-powered travel guidance system
 
 import streamlit as st
 from datetime import datetime
-from utils.ai_assistant import get_ai_response
+from utils.ai_assistant import stream_ai_response, estimate_tokens, HISTORY_WINDOW, LANGUAGES, QUICK_QUESTIONS
 from utils.budget import fetch_countries
-import time
+from streamlit.components.v1 import html as st_html
+
+# Static welcome card, rendered in an iframe (no markdown parsing on rerun).
+# Page CSS does not reach the iframe, so the card carries its own styles.
+WELCOME_HTML = """
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+    
+    body {
+        margin: 0;
+        font-family: 'Inter', sans-serif;
+    }
+    
+    .info-card {
+        background: #FFFFFF;
+        padding: 2rem;
+        border-radius: 16px;
+        box-shadow: 0 4px 20px rgba(0,0,0,0.08);
+        margin: 4px 4px 2rem 4px;
+        border-left: 4px solid #667eea;
+    }
+</style>
+<div class="info-card">
+    <h2 style="color: #667eea; margin-top: 0;">Welcome to TriEtech AI Travel Assistant</h2>
+    <p style="font-size: 1.1rem; color: #4a5568;">Your professional multilingual travel companion powered by advanced AI technology.</p>
+    
+    <h3 style="color: #2d3748; margin-top: 30px;">Our Services</h3>
+    <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin: 20px 0;">
+        <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
+            <strong>Tourist Attractions</strong><br/>
+            <span style="color: #718096;">Famous landmarks and hidden gems</span>
+        </div>
+        <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
+            <strong>Accommodation</strong><br/>
+            <span style="color: #718096;">Hotels and budget options</span>
+        </div>
+        <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
+            <strong>Food & Dining</strong><br/>
+            <span style="color: #718096;">Local cuisine recommendations</span>
+        </div>
+        <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
+            <strong>Budget Planning</strong><br/>
+            <span style="color: #718096;">Cost estimates and tips</span>
+        </div>
+        <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
+            <strong>Safety & Health</strong><br/>
+            <span style="color: #718096;">Travel safety advice</span>
+        </div>
+        <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
+            <strong>Cultural Insights</strong><br/>
+            <span style="color: #718096;">Local traditions and customs</span>
+        </div>
+    </div>
+    
+    <h3 style="color: #2d3748; margin-top: 30px;">Getting Started</h3>
+    <ol style="color: #4a5568; line-height: 1.8;">
+        <li>Select your preferred <strong>response language</strong> from the sidebar</li>
+        <li>Choose a <strong>destination country</strong> for personalized advice (optional)</li>
+        <li>Type your question below or use quick questions</li>
+    </ol>
+    
+    <div style="margin-top: 25px; padding: 15px; background: linear-gradient(135deg, #667eea15 0%, #764ba215 100%); border-radius: 10px; border: 1px solid #667eea30;">
+        <strong style="color: #667eea;">Pro Tip:</strong> <span style="color: #4a5568;">Be specific for better answers. Example: "What are the best budget hotels in Paris?" instead of just "hotels"</span>
+    </div>
+    
+    <p style="text-align: center; margin-top: 30px; color: #718096; font-size: 0.9rem;">
+        Powered by <strong>TriEtech</strong> | Advanced AI Technology
+    </p>
+</div>
+"""
+
+# Typing indicator shown while waiting for the AI response
+TYPING_HTML = """
+<div class="typing-indicator">
+    <span></span>
+    <span></span>
+    <span></span>
+</div>
+"""
+
+# CSS class and sender label for each chat role
+MESSAGE_STYLES = {
+    "user": ("user-message", "You"),
+    "assistant": ("assistant-message", "TriEtech AI")
+}
 
 st.set_page_config(page_title="TriEtech AI Assistant", page_icon="🧳", layout="wide")
 
@@ -217,30 +301,33 @@ st.markdown(f"""
         box-shadow: 0 8px 32px rgba(0,0,0,0.12);
     }}
     
-    .stat-box {{
+    /* Chat statistics (st.metric) */
+    [data-testid="stMetric"] {{
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
         padding: 1.25rem;
         border-radius: 14px;
-        color: white;
         text-align: center;
         margin: 1rem 0;
         box-shadow: 0 8px 20px rgba(102, 126, 234, 0.3);
         transition: all 0.3s ease;
     }}
     
-    .stat-box:hover {{
+    [data-testid="stMetric"]:hover {{
         transform: translateY(-4px);
         box-shadow: 0 12px 28px rgba(102, 126, 234, 0.4);
     }}
     
-    .stat-box h3 {{
-        margin: 0;
+    [data-testid="stSidebar"] [data-testid="stMetric"] * {{
+        color: white !important;
+        justify-content: center;
+    }}
+    
+    [data-testid="stMetricValue"] {{
         font-size: 2rem;
         font-weight: 800;
     }}
     
-    .stat-box p {{
-        margin: 0.5rem 0 0 0;
+    [data-testid="stMetricLabel"] p {{
         font-size: 0.875rem;
         opacity: 0.95;
         font-weight: 600;
@@ -324,6 +411,71 @@ if "countries_list" not in st.session_state:
 if "message_count" not in st.session_state:
     st.session_state.message_count = 0
 
+
+def add_chat_message(role: str, content: str):
+    """
+    Append a message to the chat history with its display HTML prebuilt
+    
+    Args:
+        role: "user" or "assistant"
+        content: Message text
+    """
+    now = datetime.now()
+    css_class, sender = MESSAGE_STYLES[role]
+    st.session_state.chat_history.append({
+        "role": role,
+        "content": content,
+        "timestamp": now,
+        "tokens": estimate_tokens(content),
+        "html": f"""
+                <div class="{css_class}">
+                    <div>{content}</div>
+                    <div class="timestamp">{sender} • {now.strftime('%I:%M %p')}</div>
+                </div>
+                """
+    })
+
+
+def send_message(user_message: str):
+    """
+    Add the user's message and the AI reply to the chat in a single run
+    
+    Args:
+        user_message: Message text to send to the assistant
+    """
+    # Only the last HISTORY_WINDOW messages are sent (exclude the new user message)
+    chat_context = st.session_state.chat_history[-HISTORY_WINDOW:]
+    
+    # Add user message and show it right away, above the reply
+    add_chat_message("user", user_message)
+    st.session_state.message_count += 1
+    st.markdown(st.session_state.chat_history[-1]["html"], unsafe_allow_html=True)
+    
+    # Show typing indicator until the first piece of the reply arrives
+    typing_placeholder = st.empty()
+    typing_placeholder.markdown(TYPING_HTML, unsafe_allow_html=True)
+    
+    def reply_stream():
+        first = True
+        for piece in stream_ai_response(
+            user_message=user_message,
+            country=st.session_state.selected_country,
+            language=st.session_state.selected_language,
+            chat_history=chat_context
+        ):
+            if first:
+                typing_placeholder.empty()
+                first = False
+            yield piece
+    
+    # Stream the reply as it is generated; the styled message is shown after the rerun
+    ai_response = st.write_stream(reply_stream())
+    typing_placeholder.empty()
+    
+    # Add AI response to chat
+    add_chat_message("assistant", ai_response)
+
+
 # Load countries
 if st.session_state.countries_list is None:
     with st.spinner("Loading countries data..."):
@@ -331,16 +483,36 @@ if st.session_state.countries_list is None:
 
 countries = st.session_state.countries_list
 
+# Build destination labels and label -> country name lookup once per session
+if "country_index" not in st.session_state:
+    labels = [f"{c['flag']} {c['name']}" for c in countries]
+    st.session_state.country_index = (
+        ["None (General Travel)"] + labels,
+        {label: c['name'] for label, c in zip(labels, countries)}
+    )
+
+country_options, country_lookup = st.session_state.country_index
+
 # Sidebar - Settings
-with st.sidebar:
+@st.fragment
+def render_sidebar(country_options: list, country_lookup: dict):
+    """
+    Render sidebar settings, chat statistics and quick questions
+    
+    Runs as a fragment, so using the sidebar widgets reruns only the
+    sidebar instead of the whole chat page.
+    
+    Args:
+        country_options: Destination labels for the selectbox
+        country_lookup: Mapping of destination label to country name
+    """
     st.markdown("### Settings")
     
     # Language Selection
-    languages = ["English", "Urdu", "Arabic", "French", "Spanish", "Chinese"]
     selected_language = st.selectbox(
         "Response Language",
-        languages,
-        index=languages.index(st.session_state.selected_language),
+        LANGUAGES,
+        index=LANGUAGES.index(st.session_state.selected_language),
         help="AI will respond in your selected language"
     )
     
@@ -350,8 +522,6 @@ with st.sidebar:
     # Country Selection
     st.markdown("### Travel Context")
     
-    country_options = ["None (General Travel)"] + [f"{c['flag']} {c['name']}" for c in countries]
-    
     selected_country_display = st.selectbox(
         "Select Destination",
         country_options,
@@ -362,8 +532,7 @@ with st.sidebar:
         st.session_state.selected_country = None
         st.info("General travel mode - Ask anything!")
     else:
-        country_name = selected_country_display.split(" ", 1)[1]
-        st.session_state.selected_country = country_name
+        st.session_state.selected_country = country_lookup[selected_country_display]
         st.success(f"Context: {selected_country_display}")
     
     # Chat Stats
@@ -372,20 +541,10 @@ with st.sidebar:
     
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown(f"""
-        <div class="stat-box">
-            <h3>{len(st.session_state.chat_history)}</h3>
-            <p>Messages</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.metric(label="Messages", value=len(st.session_state.chat_history))
     
     with col2:
-        st.markdown(f"""
-        <div class="stat-box">
-            <h3>{st.session_state.selected_language[:2]}</h3>
-            <p>Language</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.metric(label="Language", value=st.session_state.selected_language[:2])
     
     # Clear Chat Button
     st.markdown("---")
@@ -398,28 +557,16 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("### Quick Questions")
     
-    quick_questions = [
-        "What are the must-visit places?",
-        "Best food to try?",
-        "Budget travel tips?",
-        "Safety advice?",
-        "Best time to visit?",
-        "Hotel recommendations?",
-        "Local customs?",
-        "Hidden gems?"
-    ]
-    
-    for question in quick_questions:
+    for question in QUICK_QUESTIONS:
         if st.button(question, key=f"q_{question}", use_container_width=True):
-            # Add user message
-            st.session_state.chat_history.append({
-                "role": "user",
-                "content": question,
-                "timestamp": datetime.now()
-            })
-            st.session_state.message_count += 1
+            # Answer it in a full app run so the chat area updates
+            st.session_state.pending_message = question
             st.rerun()
 
+
+with st.sidebar:
+    render_sidebar(country_options, country_lookup)
+
 # Main chat area
 st.markdown("### Chat")
 
@@ -427,111 +574,15 @@ st.markdown("### Chat")
 chat_container = st.container()
 
 with chat_container:
+    # Welcome message (in a placeholder so it can be cleared when a message is sent)
+    welcome_placeholder = st.empty()
     if len(st.session_state.chat_history) == 0:
-        # Welcome message
-        st.markdown("""
-        <div class="info-card">
-            <h2 style="color: #667eea; margin-top: 0;">Welcome to TriEtech AI Travel Assistant</h2>
-            <p style="font-size: 1.1rem; color: #4a5568;">Your professional multilingual travel companion powered by advanced AI technology.</p>
-            
-            <h3 style="color: #2d3748; margin-top: 30px;">Our Services</h3>
-            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin: 20px 0;">
-                <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
-                    <strong>Tourist Attractions</strong><br/>
-                    <span style="color: #718096;">Famous landmarks and hidden gems</span>
-                </div>
-                <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
-                    <strong>Accommodation</strong><br/>
-                    <span style="color: #718096;">Hotels and budget options</span>
-                </div>
-                <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
-                    <strong>Food & Dining</strong><br/>
-                    <span style="color: #718096;">Local cuisine recommendations</span>
-                </div>
-                <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
-                    <strong>Budget Planning</strong><br/>
-                    <span style="color: #718096;">Cost estimates and tips</span>
-                </div>
-                <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
-                    <strong>Safety & Health</strong><br/>
-                    <span style="color: #718096;">Travel safety advice</span>
-                </div>
-                <div style="padding: 15px; background: #f7fafc; border-radius: 8px; border-left: 3px solid #667eea;">
-                    <strong>Cultural Insights</strong><br/>
-                    <span style="color: #718096;">Local traditions and customs</span>
-                </div>
-            </div>
-            
-            <h3 style="color: #2d3748; margin-top: 30px;">Getting Started</h3>
-            <ol style="color: #4a5568; line-height: 1.8;">
-                <li>Select your preferred <strong>response language</strong> from the sidebar</li>
-                <li>Choose a <strong>destination country</strong> for personalized advice (optional)</li>
-                <li>Type your question below or use quick questions</li>
-            </ol>
-            
-            <div style="margin-top: 25px; padding: 15px; background: linear-gradient(135deg, #667eea15 0%, #764ba215 100%); border-radius: 10px; border: 1px solid #667eea30;">
-                <strong style="color: #667eea;">Pro Tip:</strong> <span style="color: #4a5568;">Be specific for better answers. Example: "What are the best budget hotels in Paris?" instead of just "hotels"</span>
-            </div>
-            
-            <p style="text-align: center; margin-top: 30px; color: #718096; font-size: 0.9rem;">
-                Powered by <strong>TriEtech</strong> | Advanced AI Technology
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        with welcome_placeholder:
+            st_html(WELCOME_HTML, height=900, scrolling=True)
     else:
-        # Display messages
+        # Display messages (HTML is built once when each message is added)
         for msg in st.session_state.chat_history:
-            if msg["role"] == "user":
-                st.markdown(f"""
-                <div class="user-message">
-                    <div>{msg['content']}</div>
-                    <div class="timestamp">You • {msg['timestamp'].strftime('%I:%M %p')}</div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div class="assistant-message">
-                    <div>{msg['content']}</div>
-                    <div class="timestamp">TriEtech AI • {msg['timestamp'].strftime('%I:%M %p')}</div>
-                </div>
-                """, unsafe_allow_html=True)
-
-# Check if we need to get AI response
-if len(st.session_state.chat_history) > 0 and st.session_state.chat_history[-1]["role"] == "user":
-    # Show typing indicator
-    with st.spinner(""):
-        st.markdown("""
-        <div class="typing-indicator">
-            <span></span>
-            <span></span>
-            <span></span>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Small delay for realism
-        time.sleep(0.5)
-        
-        # Get AI response
-        user_message = st.session_state.chat_history[-1]["content"]
-        
-        # Prepare chat history for AI (exclude the last user message)
-        chat_context = st.session_state.chat_history[:-1]
-        
-        ai_response = get_ai_response(
-            user_message=user_message,
-            country=st.session_state.selected_country,
-            language=st.session_state.selected_language,
-            chat_history=chat_context
-        )
-        
-        # Add AI response to chat
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": ai_response,
-            "timestamp": datetime.now()
-        })
-        
-        st.rerun()
+            st.markdown(msg["html"], unsafe_allow_html=True)
 
 # Input area at bottom - using chat_input for auto-send on Enter
 user_input = st.chat_input(
@@ -539,15 +590,18 @@ user_input = st.chat_input(
     key="chat_input_field"
 )
 
+# Message to answer in this run (from a quick question or the chat input)
+pending_message = st.session_state.pop("pending_message", None)
+
 # Handle send - automatically triggers on Enter
 if user_input and user_input.strip():
-    # Add user message
-    st.session_state.chat_history.append({
-        "role": "user",
-        "content": user_input.strip(),
-        "timestamp": datetime.now()
-    })
-    st.session_state.message_count += 1
+    pending_message = user_input.strip()
+
+# Stream the AI response in this same run, then rerun once to render both messages
+if pending_message:
+    welcome_placeholder.empty()
+    with chat_container:
+        send_message(pending_message)
     st.rerun()
 
 # Footer
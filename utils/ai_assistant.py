@@ -4,32 +4,41 @@ Handles chatbot functionality and AI responses for tourist assistance
 Uses Groq's ultra-fast LLM API with Llama models
 """
 
-from typing import List, Dict, Optional
-from config.secrets_manager import GROQ_API_KEY
-from groq import Groq
+import heapq
+import json
+import re
+import threading
+import streamlit as st
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional
+from config.secrets_manager import GROQ_API_KEY, get_secret
 
-# Get Groq API key from secrets manager (works for both local and cloud)
-client = None
-if GROQ_API_KEY:
-    client = Groq(api_key=GROQ_API_KEY)
+# groq is imported on first use (see _get_groq_client) to keep page load fast
+if TYPE_CHECKING:
+    from groq import Groq, AsyncGroq
 
 
-def get_system_prompt(country: Optional[str] = None, language: str = "English") -> str:
-    """
-    Generate system prompt for the AI assistant
-    
-    Args:
-        country: Selected country for context
-        language: Response language
-        
-    Returns:
-        System prompt string
-    """
-    country_context = f"\n\nCurrent Context: The user is interested in {country}. Provide answers specifically related to {country} when relevant." if country else ""
-    
-    language_instruction = f"\n\nIMPORTANT: Respond in {language} language. All your responses must be in {language}."
-    
-    return f"""You are a professional multilingual tourist assistant named "TravelBot". Your job is to guide travelers around the world with expertise and warmth.
+# Token budget per request (prompt + response)
+MAX_CONTEXT_TOKENS = 8192
+MAX_RESPONSE_TOKENS = 2000
+
+# Maximum number of previous messages sent with each request
+HISTORY_WINDOW = int(get_secret("CHAT_HISTORY_WINDOW", "12"))
+
+# Groq chat completion settings
+COMPLETION_SETTINGS = {
+    "model": "llama-3.3-70b-versatile",
+    "temperature": 0.7,
+    "max_tokens": MAX_RESPONSE_TOKENS,
+    "top_p": 0.9,
+    "stream": False
+}
+
+# Static system prompt, identical for every request
+SYSTEM_PROMPT = """You are a professional multilingual tourist assistant named "TravelBot". Your job is to guide travelers around the world with expertise and warmth.
 
 Your capabilities:
 - Provide detailed travel advice for any country or city
@@ -51,56 +60,346 @@ Response Style:
 - Use emojis appropriately to make responses engaging
 - Give multiple options when possible (budget/mid-range/luxury)
 - Include practical tips and insider knowledge
-- If unsure, admit it and suggest reliable resources{country_context}{language_instruction}"""
+- If unsure, admit it and suggest reliable resources"""
 
+# Response languages offered by the assistant
+LANGUAGES = ["English", "Urdu", "Arabic", "French", "Spanish", "Chinese"]
 
-def get_ai_response(user_message: str, country: Optional[str] = None, language: str = "English", chat_history: Optional[List[Dict]] = None) -> str:
+# Quick questions offered in the AI Assistant sidebar
+QUICK_QUESTIONS = [
+    "What are the must-visit places?",
+    "Best food to try?",
+    "Budget travel tips?",
+    "Safety advice?",
+    "Best time to visit?",
+    "Hotel recommendations?",
+    "Local customs?",
+    "Hidden gems?"
+]
+
+# Precomputed quick-question answers (generated by build_quick_answers.py)
+QUICK_ANSWERS_FILE = "data/quick_answers.json"
+
+
+# Maximum number of AI responses kept in the in-memory response cache
+RESPONSE_CACHE_SIZE = 512
+
+
+# Language-specific messages shown when the AI is unavailable (read-only)
+FALLBACK_MESSAGES = MappingProxyType({
+    "English": "⚠️ **AI Assistant Unavailable**\n\nThe AI assistant requires a valid Groq API key. Please add your GROQ_API_KEY to the .env file.\n\nGet your free API key at: https://console.groq.com/keys",
+    "Urdu": "⚠️ **AI اسسٹنٹ دستیاب نہیں**\n\nAI اسسٹنٹ کو Groq API کلید کی ضرورت ہے۔ براہ کرم اپنی GROQ_API_KEY کو .env فائل میں شامل کریں۔",
+    "Arabic": "⚠️ **مساعد الذكاء الاصطناعي غير متاح**\n\nيتطلب مساعد الذكاء الاصطناعي مفتاح Groq API صالحًا. يرجى إضافة GROQ_API_KEY إلى ملف .env",
+    "French": "⚠️ **Assistant IA indisponible**\n\nL'assistant IA nécessite une clé API Groq valide. Veuillez ajouter votre GROQ_API_KEY au fichier .env",
+    "Spanish": "⚠️ **Asistente de IA no disponible**\n\nEl asistente de IA requiere una clave API de Groq válida. Agregue su GROQ_API_KEY al archivo .env",
+    "Chinese": "⚠️ **AI助手不可用**\n\nAI助手需要有效的Groq API密钥。请将您的GROQ_API_KEY添加到.env文件中"
+})
+
+
+@st.cache_resource
+def _get_groq_client() -> Optional["Groq"]:
+    """
+    Get the shared Groq client (one per server process)
+    
+    Caching the client keeps its HTTP connection pool alive, so the
+    TLS handshake to the Groq API is paid once instead of per message.
+    
+    Returns:
+        Groq client, or None if no API key is configured
+    """
+    # Get Groq API key from secrets manager (works for both local and cloud)
+    if not GROQ_API_KEY:
+        return None
+    
+    # Deferred import: pages that never send a message don't pay for it
+    from groq import Groq
+    return Groq(api_key=GROQ_API_KEY, timeout=30.0)
+
+
+@st.cache_resource
+def _load_quick_answers() -> Dict:
+    """
+    Load precomputed quick-question answers (once per server process)
+    
+    Returns:
+        Nested dict of country -> language -> question -> answer,
+        or an empty dict if the file is missing or invalid
+    """
+    try:
+        with open(QUICK_ANSWERS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def get_quick_answer(user_message: str, country: Optional[str] = None, language: str = "English") -> Optional[str]:
+    """
+    Look up a precomputed answer for a quick question
+    
+    Args:
+        user_message: User's message
+        country: Selected country (None for general travel)
+        language: Response language
+        
+    Returns:
+        Cached answer, or None if there is no precomputed answer
+    """
+    answers = _load_quick_answers()
+    return answers.get(country or "", {}).get(language, {}).get(user_message.strip())
+
+
+# (country, language, normalized question) -> AI response, shared by all sessions
+_response_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+def normalize_question(user_message: str) -> str:
+    """
+    Normalize a question so trivially different phrasings share a cache entry
+    
+    Lowercases, collapses whitespace and drops punctuation, so
+    "Best food in Paris?" and "best food in paris" match.
+    
+    Args:
+        user_message: User's message
+        
+    Returns:
+        Normalized question text
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", user_message.lower()).split())
+
+
+def get_cached_response(user_message: str, country: Optional[str] = None, language: str = "English") -> Optional[str]:
+    """
+    Look up a previous AI response to the same question
+    
+    Args:
+        user_message: User's message
+        country: Selected country (None for general travel)
+        language: Response language
+        
+    Returns:
+        Cached response, or None on a cache miss
+    """
+    key = (country or "", language, normalize_question(user_message))
+    with _response_cache_lock:
+        response = _response_cache.get(key)
+        if response is not None:
+            _response_cache.move_to_end(key)
+    return response
+
+
+def cache_response(user_message: str, country: Optional[str], language: str, response: str):
+    """
+    Store an AI response, evicting the least recently used entry when full
+    
+    Args:
+        user_message: User's message
+        country: Selected country (None for general travel)
+        language: Response language
+        response: AI response text
+    """
+    key = (country or "", language, normalize_question(user_message))
+    with _response_cache_lock:
+        _response_cache[key] = response
+        _response_cache.move_to_end(key)
+        if len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+
+def estimate_tokens(text: str) -> int:
     """
-    Get AI response using Groq API (Llama 3.1 70B)
+    Estimate the number of tokens in a text
+    
+    ASCII (English) text averages ~4 characters per token; scripts such as
+    Urdu, Arabic and Chinese are closer to 1 character per token, so each
+    non-ASCII character is counted as a token.
+    
+    Args:
+        text: Message text
+        
+    Returns:
+        Approximate token count
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    non_ascii_chars = len(text) - ascii_chars
+    return ascii_chars // 4 + non_ascii_chars + 1
+
+
+@lru_cache(maxsize=256)
+def get_context_prompt(country: Optional[str] = None, language: str = "English") -> str:
+    """
+    Generate the country and language instructions for the AI assistant
+    
+    Sent as a second system message after SYSTEM_PROMPT, so the first
+    message stays byte-identical for every user and can be prefix-cached.
+    
+    Args:
+        country: Selected country for context
+        language: Response language
+        
+    Returns:
+        Context prompt string
+    """
+    country_context = f"Current Context: The user is interested in {country}. Provide answers specifically related to {country} when relevant.\n\n" if country else ""
+    
+    language_instruction = f"IMPORTANT: Respond in {language} language. All your responses must be in {language}."
+    
+    return f"{country_context}{language_instruction}"
+
+
+def build_chat_messages(user_message: str, country: Optional[str] = None, language: str = "English", chat_history: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Build the message list for a Groq chat completion
     
     Args:
         user_message: User's message
         country: Selected country for context (optional)
         language: Response language (default: English)
-        chat_history: Previous conversation history (optional)
+        chat_history: Previous conversation history (optional); messages may
+            carry a precomputed "tokens" count
         
     Returns:
-        AI response text
+        List of chat messages (system prompts, recent history, user message)
+    """
+    # Build conversation context
+    context_prompt = get_context_prompt(country, language)
+    
+    # Build messages for Groq chat completion (static prompt first for prefix caching)
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": context_prompt}
+    ]
+    
+    # Add as much recent chat history as fits in the window and token budget
+    if chat_history:
+        budget = (
+            MAX_CONTEXT_TOKENS - MAX_RESPONSE_TOKENS - estimate_tokens(SYSTEM_PROMPT)
+            - estimate_tokens(context_prompt) - estimate_tokens(user_message)
+        )
+        recent_history = []
+        for msg in islice(reversed(chat_history), HISTORY_WINDOW):
+            if msg['role'] not in ['user', 'assistant']:
+                continue
+            tokens = msg.get('tokens') or estimate_tokens(msg['content'])
+            if tokens > budget:
+                break
+            budget -= tokens
+            recent_history.append({
+                "role": msg['role'],
+                "content": msg['content']
+            })
+        messages.extend(reversed(recent_history))
+    
+    # Add current user message
+    messages.append({"role": "user", "content": user_message})
+    
+    return messages
+
+
+def stream_ai_response(user_message: str, country: Optional[str] = None, language: str = "English", chat_history: Optional[List[Dict]] = None) -> Iterator[str]:
+    """
+    Stream an AI response from the Groq API (Llama 3.3 70B) as it is generated
+    
+    Args:
+        user_message: User's message
+        country: Selected country for context (optional)
+        language: Response language (default: English)
+        chat_history: Previous conversation history (optional); messages may
+            carry a precomputed "tokens" count
+        
+    Yields:
+        Pieces of the AI response text
     """
+    # Quick questions with a precomputed answer skip the API call
+    quick_answer = get_quick_answer(user_message, country, language)
+    if quick_answer:
+        yield quick_answer
+        return
+    
+    # Opening questions don't depend on earlier messages, so repeats
+    # (from any session) can reuse a previous answer
+    cacheable = not chat_history
+    if cacheable:
+        cached = get_cached_response(user_message, country, language)
+        if cached:
+            yield cached
+            return
+    
     # Check if Groq client is available
+    client = _get_groq_client()
     if not client:
-        return get_fallback_response(user_message, language)
+        yield get_fallback_response(user_message, language)
+        return
     
+    parts = []
     try:
-        # Build conversation context
-        system_prompt = get_system_prompt(country, language)
+        # Generate response using Groq API, yielding tokens as they arrive
+        stream = client.chat.completions.create(
+            messages=build_chat_messages(user_message, country, language, chat_history),
+            **{**COMPLETION_SETTINGS, "stream": True}
+        )
         
-        # Build messages for Groq chat completion
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
+        for chunk in stream:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            if content:
+                parts.append(content)
+                yield content
         
-        # Add chat history if available (last 6 messages for context)
-        if chat_history and len(chat_history) > 0:
-            recent_history = chat_history[-6:] if len(chat_history) > 6 else chat_history
-            for msg in recent_history:
-                if msg['role'] in ['user', 'assistant']:
-                    messages.append({
-                        "role": msg['role'],
-                        "content": msg['content']
-                    })
+    except Exception as e:
+        print(f"Groq API Error: {str(e)}")
+        # Keep a partial answer; only fall back if nothing was received
+        if not parts:
+            yield get_fallback_response(user_message, language)
+        return
+    
+    if cacheable and parts:
+        cache_response(user_message, country, language, "".join(parts))
+
+
+def get_ai_response(user_message: str, country: Optional[str] = None, language: str = "English", chat_history: Optional[List[Dict]] = None) -> str:
+    """
+    Get the complete AI response (non-streaming callers)
+    
+    Args:
+        user_message: User's message
+        country: Selected country for context (optional)
+        language: Response language (default: English)
+        chat_history: Previous conversation history (optional)
         
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
+    Returns:
+        AI response text
+    """
+    return "".join(stream_ai_response(user_message, country, language, chat_history))
+
+
+async def get_ai_response_async(client: "AsyncGroq", user_message: str, country: Optional[str] = None, language: str = "English", chat_history: Optional[List[Dict]] = None) -> str:
+    """
+    Async variant of get_ai_response for batch callers
+    
+    Many requests can share one AsyncGroq client and run concurrently
+    (e.g. with asyncio.gather) instead of waiting on each other.
+    
+    Args:
+        client: AsyncGroq client, created inside the caller's event loop
+        user_message: User's message
+        country: Selected country for context (optional)
+        language: Response language (default: English)
+        chat_history: Previous conversation history (optional)
         
+    Returns:
+        AI response text
+    """
+    # Quick questions with a precomputed answer skip the API call
+    quick_answer = get_quick_answer(user_message, country, language)
+    if quick_answer:
+        return quick_answer
+    
+    try:
         # Generate response using Groq API
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=2000,
-            top_p=0.9,
-            stream=False
+        response = await client.chat.completions.create(
+            messages=build_chat_messages(user_message, country, language, chat_history),
+            **COMPLETION_SETTINGS
         )
         
         return response.choices[0].message.content
@@ -121,23 +420,13 @@ def get_fallback_response(user_message: str, language: str = "English") -> str:
     Returns:
         Fallback response
     """
-    
-    # Language-specific error messages
-    error_messages = {
-        "English": "⚠️ **AI Assistant Unavailable**\n\nThe AI assistant requires a valid Groq API key. Please add your GROQ_API_KEY to the .env file.\n\nGet your free API key at: https://console.groq.com/keys",
-        "Urdu": "⚠️ **AI اسسٹنٹ دستیاب نہیں**\n\nAI اسسٹنٹ کو Groq API کلید کی ضرورت ہے۔ براہ کرم اپنی GROQ_API_KEY کو .env فائل میں شامل کریں۔",
-        "Arabic": "⚠️ **مساعد الذكاء الاصطناعي غير متاح**\n\nيتطلب مساعد الذكاء الاصطناعي مفتاح Groq API صالحًا. يرجى إضافة GROQ_API_KEY إلى ملف .env",
-        "French": "⚠️ **Assistant IA indisponible**\n\nL'assistant IA nécessite une clé API Groq valide. Veuillez ajouter votre GROQ_API_KEY au fichier .env",
-        "Spanish": "⚠️ **Asistente de IA no disponible**\n\nEl asistente de IA requiere una clave API de Groq válida. Agregue su GROQ_API_KEY al archivo .env",
-        "Chinese": "⚠️ **AI助手不可用**\n\nAI助手需要有效的Groq API密钥。请将您的GROQ_API_KEY添加到.env文件中"
-    }
-    
-    return error_messages.get(language, error_messages["English"])
+    return FALLBACK_MESSAGES.get(language, FALLBACK_MESSAGES["English"])
 
 
 # Keep the existing analyze_budget_input function if it exists below
 
 
+@st.cache_data(hash_funcs={dict: lambda d: tuple(sorted(d.items()))})
 def analyze_budget_input(budget_data: Dict) -> str:
     """
     Analyze budget data and provide recommendations
@@ -148,16 +437,22 @@ def analyze_budget_input(budget_data: Dict) -> str:
     Returns:
         Analysis and recommendations
     """
-    total = sum(budget_data.values())
+    # Single pass: total and the categories with a positive amount
+    total = 0
+    spent = []
+    for category, amount in budget_data.items():
+        total += amount
+        if amount > 0:
+            spent.append((category, amount))
     
     if total == 0:
         return "No budget data to analyze. Please create a budget first."
     
-    # Calculate percentages
-    percentages = {k: (v / total * 100) for k, v in budget_data.items() if v > 0}
+    # Percent of total per unit of currency
+    scale = 100 / total
     
-    # Find top categories
-    top_categories = sorted(percentages.items(), key=lambda x: x[1], reverse=True)[:3]
+    # Find top categories (largest amount == largest percentage)
+    top_categories = heapq.nlargest(3, spent, key=lambda x: x[1])
     
     analysis = f"""📊 **Budget Analysis:**
 
@@ -166,20 +461,19 @@ def analyze_budget_input(budget_data: Dict) -> str:
 **Top Expenses:**
 """
     
-    for i, (category, pct) in enumerate(top_categories, 1):
-        amount = budget_data[category]
-        analysis += f"{i}. {category}: ${amount:,.2f} ({pct:.1f}%)\n"
+    for i, (category, amount) in enumerate(top_categories, 1):
+        analysis += f"{i}. {category}: ${amount:,.2f} ({amount * scale:.1f}%)\n"
     
     # Recommendations
     analysis += "\n**Recommendations:**\n"
     
-    if percentages.get("Emergency Fund", 0) < 5:
+    if budget_data.get("Emergency Fund", 0) * scale < 5:
         analysis += "- Consider adding 10-15% for emergency fund\n"
     
-    if percentages.get("Accommodation", 0) > 40:
+    if budget_data.get("Accommodation", 0) * scale > 40:
         analysis += "- Accommodation seems high, consider alternatives like hostels or Airbnb\n"
     
-    if percentages.get("Food & Dining", 0) < 15:
+    if budget_data.get("Food & Dining", 0) * scale < 15:
         analysis += "- Food budget might be low, ensure adequate allocation\n"
     
     return analysis
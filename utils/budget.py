@@ -4,13 +4,32 @@ Handles intelligent trip budget planning with real-world cost estimation
 """
 
 from typing import Dict, List, Optional, Tuple
+import numpy as np
+import orjson
 import requests
 import json
 import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from utils.currency import convert_currency
 
 
+# Shared HTTP session so connections (and TLS handshakes) are reused across calls
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # Retry failed connects only: retrying read timeouts would multiply the wait
+    max_retries=Retry(total=2, read=0, backoff_factor=0.2)
+))
+
+
 # Country Cost Categories based on real-world data
 COUNTRY_COST_CATEGORIES = {
     "high": [
@@ -32,6 +51,19 @@ COUNTRY_COST_CATEGORIES = {
     ]
 }
 
+# Lowercased country name -> cost category, for exact-match lookups
+_COUNTRY_CATEGORY = {
+    country.lower(): category
+    for category, countries in COUNTRY_COST_CATEGORIES.items()
+    for country in countries
+}
+
+# Lowercased country names per category, in COUNTRY_COST_CATEGORIES order
+_COUNTRY_NAMES_LOWER = [
+    (category, tuple(country.lower() for country in countries))
+    for category, countries in COUNTRY_COST_CATEGORIES.items()
+]
+
 # Lifestyle-based cost multipliers (all prices in USD per day)
 LIFESTYLE_COSTS = {
     "Luxury": {
@@ -55,48 +87,125 @@ LIFESTYLE_COSTS = {
 }
 
 
-def fetch_countries() -> List[Dict]:
+# Breakdown categories returned by calculate_smart_budget (cost kinds + misc)
+BREAKDOWN_CATEGORIES = ("Accommodation", "Food & Dining", "Transportation", "Activities", "Miscellaneous")
+
+# LIFESTYLE_COSTS as one array: [lifestyle, cost kind, country category]
+_COST_KINDS = ("hotel", "food", "transport", "activities")
+_COST_CATEGORIES = ("high", "medium", "low")
+_LIFESTYLE_INDEX = {lifestyle: i for i, lifestyle in enumerate(LIFESTYLE_COSTS)}
+_CATEGORY_INDEX = {category: i for i, category in enumerate(_COST_CATEGORIES)}
+_COSTS = np.array([
+    [[LIFESTYLE_COSTS[lifestyle][kind][category] for category in _COST_CATEGORIES]
+     for kind in _COST_KINDS]
+    for lifestyle in LIFESTYLE_COSTS
+], dtype=np.float64)
+
+
+# Country list cache (on disk across restarts, in memory for the process)
+COUNTRIES_CACHE_FILE = "data/countries_cache.json"
+COUNTRIES_CACHE_TTL = 24 * 60 * 60  # seconds
+
+_countries_cache: Optional[List[Dict]] = None
+_countries_cache_time = 0.0
+
+
+def _load_countries_cache() -> Tuple[Optional[List[Dict]], float]:
     """
-    Fetch countries from REST Countries API
+    Load the cached country list from disk
     
     Returns:
-        List of country dictionaries with name, currency, and flag
+        Tuple of (countries or None, time the cache was written)
+    """
+    try:
+        with open(COUNTRIES_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f), os.path.getmtime(COUNTRIES_CACHE_FILE)
+    except (OSError, json.JSONDecodeError):
+        return None, 0.0
+
+
+def _download_countries() -> Optional[List[Dict]]:
+    """
+    Download countries from REST Countries API
+    
+    Returns:
+        Sorted list of country dictionaries, or None if the request failed
     """
     try:
-        response = requests.get("https://restcountries.com/v3.1/all", timeout=10)
+        # Only request the fields we use (much smaller payload)
+        response = _SESSION.get(
+            "https://restcountries.com/v3.1/all",
+            params={"fields": "name,currencies,flag"},
+            timeout=10
+        )
+        
+        if response.status_code != 200:
+            return None
+        
+        data = orjson.loads(response.content)
+        countries = []
         
-        if response.status_code == 200:
-            data = response.json()
-            countries = []
+        for country in data:
+            # Extract common name
+            name = country.get("name", {}).get("common", "Unknown")
             
-            for country in data:
-                # Extract common name
-                name = country.get("name", {}).get("common", "Unknown")
-                
-                # Extract first currency
-                currencies = country.get("currencies", {})
-                currency_code = list(currencies.keys())[0] if currencies else "USD"
-                currency_name = currencies.get(currency_code, {}).get("name", "Dollar") if currencies else "Dollar"
-                
-                # Extract flag emoji
-                flag = country.get("flag", "🌍")
-                
-                countries.append({
-                    "name": name,
-                    "currency": currency_code,
-                    "currency_name": currency_name,
-                    "flag": flag
-                })
+            # Extract first currency
+            currencies = country.get("currencies") or {}
+            currency_code = next(iter(currencies), "USD")
+            currency_name = currencies.get(currency_code, {}).get("name", "Dollar")
             
-            # Sort alphabetically
-            countries.sort(key=lambda x: x["name"])
-            return countries
-        else:
-            return get_fallback_countries()
+            # Extract flag emoji
+            flag = country.get("flag", "🌍")
             
+            countries.append({
+                "name": name,
+                "currency": currency_code,
+                "currency_name": currency_name,
+                "flag": flag
+            })
+        
+        # Sort alphabetically
+        countries.sort(key=itemgetter("name"))
+        return countries
+        
     except Exception as e:
         print(f"Error fetching countries: {e}")
-        return get_fallback_countries()
+        return None
+
+
+def fetch_countries() -> List[Dict]:
+    """
+    Fetch countries from REST Countries API (cached for COUNTRIES_CACHE_TTL)
+    
+    The list is kept in memory and in COUNTRIES_CACHE_FILE, so the API is
+    only called once a day. A stale cache is still preferred over the
+    short fallback list when the API is unreachable.
+    
+    Returns:
+        List of country dictionaries with name, currency, and flag
+    """
+    global _countries_cache, _countries_cache_time
+    
+    # Cold start: pick up the list saved by a previous run
+    if _countries_cache is None:
+        _countries_cache, _countries_cache_time = _load_countries_cache()
+    
+    if _countries_cache and time.time() - _countries_cache_time < COUNTRIES_CACHE_TTL:
+        return _countries_cache
+    
+    countries = _download_countries()
+    if not countries:
+        return _countries_cache or get_fallback_countries()
+    
+    _countries_cache, _countries_cache_time = countries, time.time()
+    try:
+        os.makedirs(os.path.dirname(COUNTRIES_CACHE_FILE), exist_ok=True)
+        with open(COUNTRIES_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(countries, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"Error saving countries cache: {e}")
+    
+    return countries
 
 
 def get_fallback_countries() -> List[Dict]:
@@ -123,6 +232,7 @@ def get_fallback_countries() -> List[Dict]:
     ]
 
 
+@lru_cache(maxsize=256)
 def get_country_category(country_name: str) -> str:
     """
     Determine country cost category (high/medium/low)
@@ -133,9 +243,16 @@ def get_country_category(country_name: str) -> str:
     Returns:
         Category: 'high', 'medium', or 'low'
     """
-    for category, countries in COUNTRY_COST_CATEGORIES.items():
-        if any(country.lower() in country_name.lower() or country_name.lower() in country.lower() 
-               for country in countries):
+    name = country_name.lower()
+    
+    # Exact match first (the common case)
+    category = _COUNTRY_CATEGORY.get(name)
+    if category:
+        return category
+    
+    # Partial match for name variants (e.g. "United States of America")
+    for category, countries in _COUNTRY_NAMES_LOWER:
+        if any(country in name or name in country for country in countries):
             return category
     
     # Default to medium if not found
@@ -165,23 +282,14 @@ def calculate_smart_budget(
     # Get country cost category
     category = get_country_category(country)
     
-    # Get costs for the lifestyle and category (in USD)
-    costs = LIFESTYLE_COSTS[lifestyle]
-    
-    # Calculate daily costs in USD
-    hotel_per_day_usd = costs["hotel"][category]
-    food_per_day_usd = costs["food"][category] * travelers  # Food multiplied by travelers
-    transport_per_day_usd = costs["transport"][category]
-    activities_per_day_usd = costs["activities"][category]
+    # Daily costs in USD (hotel, food, transport, activities); food is per traveler
+    daily_usd = _COSTS[_LIFESTYLE_INDEX[lifestyle], :, _CATEGORY_INDEX[category]] * np.array([1, travelers, 1, 1])
     
     # Calculate totals in USD
-    hotel_total_usd = hotel_per_day_usd * days
-    food_total_usd = food_per_day_usd * days
-    transport_total_usd = transport_per_day_usd * days
-    activities_total_usd = activities_per_day_usd * days
+    totals_usd = daily_usd * days
     
     # Add miscellaneous (10% of total)
-    subtotal_usd = hotel_total_usd + food_total_usd + transport_total_usd + activities_total_usd
+    subtotal_usd = totals_usd.sum()
     misc_total_usd = subtotal_usd * 0.10
     
     total_cost_usd = subtotal_usd + misc_total_usd
@@ -189,29 +297,23 @@ def calculate_smart_budget(
     # Convert to target currency if not USD
     exchange_rate = 1.0
     if currency_code != "USD":
-        conversion = convert_currency(total_cost_usd, "USD", currency_code)
+        # convert_currency caches each base currency's rates for the hour
+        conversion = convert_currency(1.0, "USD", currency_code)
         if conversion and conversion.get("rate"):
             exchange_rate = conversion["rate"]
     
-    # Apply exchange rate to all amounts
-    hotel_total = hotel_total_usd * exchange_rate
-    food_total = food_total_usd * exchange_rate
-    transport_total = transport_total_usd * exchange_rate
-    activities_total = activities_total_usd * exchange_rate
-    misc_total = misc_total_usd * exchange_rate
-    total_cost = total_cost_usd * exchange_rate
+    # Apply exchange rate to all amounts in one multiply:
+    # [4 category totals, misc, total, 4 daily costs]
+    amounts = np.concatenate((totals_usd, (misc_total_usd, total_cost_usd), daily_usd)) * exchange_rate
+    amounts = amounts.tolist()
+    
+    breakdown = dict(zip(BREAKDOWN_CATEGORIES, amounts[:5]))
+    total_cost = amounts[5]
+    daily_costs = dict(zip(_COST_KINDS, amounts[6:]))
     
     per_person_cost = total_cost / travelers if travelers > 0 else 0
     daily_cost = total_cost / days if days > 0 else 0
     
-    breakdown = {
-        "Accommodation": hotel_total,
-        "Food & Dining": food_total,
-        "Transportation": transport_total,
-        "Activities": activities_total,
-        "Miscellaneous": misc_total
-    }
-    
     return {
         "total_cost": total_cost,
         "per_person_cost": per_person_cost,
@@ -220,15 +322,92 @@ def calculate_smart_budget(
         "country_category": category,
         "currency_code": currency_code,
         "exchange_rate": exchange_rate,
-        "daily_costs": {
-            "hotel": hotel_per_day_usd * exchange_rate,
-            "food": food_per_day_usd * exchange_rate,
-            "transport": transport_per_day_usd * exchange_rate,
-            "activities": activities_per_day_usd * exchange_rate
-        }
+        "daily_costs": daily_costs
     }
 
 
+def calculate_smart_budget_batch(
+    countries: List[str],
+    lifestyles: List[str],
+    travelers: int,
+    days: int,
+    currency_code: str = "USD"
+) -> np.ndarray:
+    """
+    Calculate total trip costs for every lifestyle/country combination at once
+    
+    Same totals as calculate_smart_budget, for comparison views; the
+    exchange rate is looked up once for the whole batch.
+    
+    Args:
+        countries: Country names
+        lifestyles: Lifestyle choices (Luxury/Standard/Budget)
+        travelers: Number of travelers
+        days: Number of days
+        currency_code: Target currency code for conversion
+        
+    Returns:
+        Array of shape (len(lifestyles), len(countries)) with total costs
+        in the target currency
+    """
+    lifestyle_idx = np.array([_LIFESTYLE_INDEX[lifestyle] for lifestyle in lifestyles], dtype=np.intp)
+    category_idx = np.array([_CATEGORY_INDEX[get_country_category(country)] for country in countries], dtype=np.intp)
+    
+    # Daily costs per (lifestyle, country, cost kind); food is per traveler
+    daily_usd = _COSTS[lifestyle_idx[:, None], :, category_idx[None, :]] * np.array([1, travelers, 1, 1])
+    
+    # Sum cost kinds, add 10% miscellaneous
+    totals_usd = daily_usd.sum(axis=-1) * days * 1.10
+    
+    exchange_rate = 1.0
+    if currency_code != "USD":
+        # convert_currency caches each base currency's rates for the hour
+        conversion = convert_currency(1.0, "USD", currency_code)
+        if conversion and conversion.get("rate"):
+            exchange_rate = conversion["rate"]
+    
+    return totals_usd * exchange_rate
+
+
+# Smart suggestion rules: (condition, type, icon, message template), in display order.
+# Conditions and templates use the fields built in generate_smart_suggestions.
+SMART_SUGGESTION_RULES = [
+    # Lifestyle suggestions
+    (lambda c: c["lifestyle"] == "Luxury" and c["total_cost"] > 5000,
+     "info", "💡", "Consider switching to Standard lifestyle to reduce costs by ~40%"),
+    (lambda c: c["lifestyle"] == "Budget" and c["country_category"] == "high",
+     "warning", "⚠️", "Budget travel in high-cost countries can be challenging. Consider medium-cost alternatives."),
+    (lambda c: c["lifestyle"] == "Budget",
+     "success", "✨", "Great choice! Consider upgrading specific experiences for more comfort."),
+    
+    # Traveler-based suggestions
+    (lambda c: c["travelers"] > 4,
+     "success", "👥", "Group of {travelers}! You may qualify for group discounts on accommodation and tours."),
+    (lambda c: c["travelers"] == 1,
+     "info", "🧳", "Solo travel tip: Consider hostels or homestays for social experiences."),
+    
+    # Duration suggestions
+    (lambda c: c["days"] > 14,
+     "info", "📅", "Long trip! Look for monthly rates on accommodation for better deals."),
+    (lambda c: c["days"] < 4,
+     "warning", "⏰", "Short trip! Focus budget on key experiences rather than accommodation."),
+    
+    # Cost-based suggestions
+    (lambda c: c["per_day_cost"] < 100,
+     "success", "💰", "Excellent budget! You're planning an affordable adventure."),
+    (lambda c: c["per_day_cost"] > 500,
+     "info", "💎", "Premium travel experience! Consider travel insurance for peace of mind."),
+    
+    # Country category suggestions
+    (lambda c: c["country_category"] == "high",
+     "info", "🌍", "High-cost destination. Book flights and hotels early for best rates."),
+    
+    # Emergency fund suggestion (always shown)
+    (lambda c: True,
+     "warning", "🆘", "Add 15% emergency buffer (~${emergency_fund:,.0f}) for unexpected expenses.")
+]
+
+
 def generate_smart_suggestions(
     total_cost: float,
     lifestyle: str,
@@ -249,93 +428,80 @@ def generate_smart_suggestions(
     Returns:
         List of suggestion dictionaries with 'type' and 'message'
     """
-    suggestions = []
-    
-    # Lifestyle suggestions
-    if lifestyle == "Luxury" and total_cost > 5000:
-        suggestions.append({
-            "type": "info",
-            "icon": "💡",
-            "message": "Consider switching to Standard lifestyle to reduce costs by ~40%"
-        })
-    
-    if lifestyle == "Budget" and country_category == "high":
-        suggestions.append({
-            "type": "warning",
-            "icon": "⚠️",
-            "message": f"Budget travel in high-cost countries can be challenging. Consider medium-cost alternatives."
-        })
-    
-    if lifestyle == "Budget":
-        suggestions.append({
-            "type": "success",
-            "icon": "✨",
-            "message": "Great choice! Consider upgrading specific experiences for more comfort."
-        })
+    context = {
+        "total_cost": total_cost,
+        "lifestyle": lifestyle,
+        "travelers": travelers,
+        "days": days,
+        "country_category": country_category,
+        "per_day_cost": total_cost / days if days > 0 else 0,
+        "emergency_fund": total_cost * 0.15
+    }
     
-    # Traveler-based suggestions
-    if travelers > 4:
-        suggestions.append({
-            "type": "success",
-            "icon": "👥",
-            "message": f"Group of {travelers}! You may qualify for group discounts on accommodation and tours."
-        })
-    
-    if travelers == 1:
-        suggestions.append({
-            "type": "info",
-            "icon": "🧳",
-            "message": "Solo travel tip: Consider hostels or homestays for social experiences."
-        })
+    return [
+        {"type": kind, "icon": icon, "message": message.format(**context)}
+        for condition, kind, icon, message in SMART_SUGGESTION_RULES
+        if condition(context)
+    ]
+
+
+# Budget history, one JSON entry per line (newest last)
+BUDGET_HISTORY_FILE = "data/budget_history.jsonl"
+BUDGET_HISTORY_LIMIT = 100
+
+# Saves since startup; the file is trimmed on the first save and every 50th after
+_history_saves = 0
+
+# Streamlit sessions are threads in one process: serialize appends and
+# compaction so a line appended mid-compaction is not lost
+_history_lock = threading.Lock()
+
+
+def _read_budget_history_lines(limit: int = BUDGET_HISTORY_LIMIT) -> List[str]:
+    """Read the last `limit` non-empty lines of the history file"""
+    try:
+        with open(BUDGET_HISTORY_FILE, 'r', encoding='utf-8') as f:
+            lines = deque((line for line in f if line.strip()), maxlen=limit)
+    except FileNotFoundError:
+        return []
     
-    # Duration suggestions
-    if days > 14:
-        suggestions.append({
-            "type": "info",
-            "icon": "📅",
-            "message": "Long trip! Look for monthly rates on accommodation for better deals."
-        })
-    
-    if days < 4:
-        suggestions.append({
-            "type": "warning",
-            "icon": "⏰",
-            "message": "Short trip! Focus budget on key experiences rather than accommodation."
-        })
+    return list(lines)
+
+
+def load_budget_history(limit: int = BUDGET_HISTORY_LIMIT) -> List[Dict]:
+    """
+    Load the most recent budget calculations from the history file
     
-    # Cost-based suggestions
-    per_day_cost = total_cost / days if days > 0 else 0
-    
-    if per_day_cost < 100:
-        suggestions.append({
-            "type": "success",
-            "icon": "💰",
-            "message": "Excellent budget! You're planning an affordable adventure."
-        })
-    elif per_day_cost > 500:
-        suggestions.append({
-            "type": "info",
-            "icon": "💎",
-            "message": "Premium travel experience! Consider travel insurance for peace of mind."
-        })
+    Timestamps are stored as epoch nanoseconds and returned as ISO strings.
     
-    # Country category suggestions
-    if country_category == "high":
-        suggestions.append({
-            "type": "info",
-            "icon": "🌍",
-            "message": "High-cost destination. Book flights and hotels early for best rates."
-        })
-    
-    # Emergency fund suggestion
-    emergency_fund = total_cost * 0.15
-    suggestions.append({
-        "type": "warning",
-        "icon": "🆘",
-        "message": f"Add 15% emergency buffer (~${emergency_fund:,.0f}) for unexpected expenses."
-    })
+    Args:
+        limit: Maximum number of entries to return
+        
+    Returns:
+        List of history entries, oldest first
+    """
+    history = []
+    for line in _read_budget_history_lines(limit):
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            # Skip a damaged line (e.g. cut short by a crash mid-append)
+            continue
+        
+        if isinstance(entry.get("timestamp"), int):
+            entry["timestamp"] = datetime.fromtimestamp(entry["timestamp"] / 1e9).isoformat()
+        history.append(entry)
     
-    return suggestions
+    return history
+
+
+def _compact_budget_history():
+    """Rewrite the history file keeping only the last BUDGET_HISTORY_LIMIT entries"""
+    lines = _read_budget_history_lines()
+    temp_file = BUDGET_HISTORY_FILE + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    os.replace(temp_file, BUDGET_HISTORY_FILE)
 
 
 def save_budget_history(
@@ -349,6 +515,9 @@ def save_budget_history(
     """
     Save budget calculation to history file
     
+    Entries are appended without reading the file; it is trimmed back to
+    BUDGET_HISTORY_LIMIT entries only occasionally.
+    
     Args:
         country: Country name
         travelers: Number of travelers
@@ -360,22 +529,15 @@ def save_budget_history(
     Returns:
         Boolean indicating success
     """
+    global _history_saves
+    
     try:
         # Create data directory if it doesn't exist
-        os.makedirs("data", exist_ok=True)
-        
-        history_file = "data/budget_history.json"
-        
-        # Load existing history
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        else:
-            history = []
+        os.makedirs(os.path.dirname(BUDGET_HISTORY_FILE), exist_ok=True)
         
         # Add new entry
         entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": time.time_ns(),
             "country": country,
             "travelers": travelers,
             "days": days,
@@ -384,14 +546,16 @@ def save_budget_history(
             "currency": currency
         }
         
-        history.append(entry)
-        
-        # Keep only last 100 entries
-        history = history[-100:]
+        line = json.dumps(entry) + "\n"
         
-        # Save
-        with open(history_file, 'w') as f:
-            json.dump(history, indent=2, fp=f)
+        with _history_lock:
+            with open(BUDGET_HISTORY_FILE, 'a', encoding='utf-8') as f:
+                f.write(line)
+            
+            # Keep only the last entries (checked lazily, not on every save)
+            _history_saves += 1
+            if _history_saves % 50 == 1:
+                _compact_budget_history()
         
         return True
         
@@ -456,3 +620,35 @@ def calculate_trip_budget(
         "per_person_cost": per_person_cost,
         "breakdown": breakdown
     }
+
+
+def calculate_trip_budget_range(
+    days,
+    persons,
+    hotel_per_day: float,
+    food_per_day: float,
+    transport_per_day: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate legacy trip budgets for many days/persons values at once
+    
+    Vectorized counterpart of calculate_trip_budget for sweeps such as
+    "cost for 1..30 days"; days and persons broadcast against each other.
+    
+    Args:
+        days: Number of days (scalar or array)
+        persons: Number of persons (scalar or array)
+        hotel_per_day: Hotel cost per day
+        food_per_day: Food cost per day per person
+        transport_per_day: Transport cost per day
+        
+    Returns:
+        Tuple of (total cost array, per-person cost array)
+    """
+    days = np.asarray(days, dtype=np.float64)
+    persons = np.asarray(persons, dtype=np.float64)
+    
+    total_cost = (hotel_per_day + transport_per_day + food_per_day * persons) * days
+    per_person_cost = np.divide(total_cost, persons, out=np.zeros_like(total_cost), where=persons > 0)
+    
+    return total_cost, per_person_cost
@@ -3,13 +3,89 @@ Chart generation utilities
 Creates visualizations for budget and financial data
 """
 
-import plotly.express as px
-import plotly.graph_objects as go
-from typing import Dict, List
-import pandas as pd
+import math
+import numpy as np
+import threading
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from typing import TYPE_CHECKING, Dict, List
+from config.secrets_manager import get_secret
 
+# plotly is imported inside the chart functions, so importing
+# this module stays cheap until a chart is actually drawn
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
-def create_budget_pie_chart(breakdown: Dict[str, float], currency: str = "USD") -> go.Figure:
+
+# Number of figures kept by each cached chart function
+FIGURE_CACHE_SIZE = 32
+
+# PLOTLY_FAST=1 skips Plotly's per-property validation when building traces.
+# Leave it unset while editing charts so typos in trace options still raise.
+# Layouts are always validated: that is what turns title strings into {'text': ...}
+PLOTLY_FAST = str(get_secret("PLOTLY_FAST", "0")).strip() == "1"
+_PLOTLY_OPTIONS = {"_validate": False} if PLOTLY_FAST else {}
+
+# Chart colors
+PIE_COLORS = ('#667eea', '#764ba2', '#f093fb')
+
+# Default gauge bands: upper edges as fractions of max_value, and their colors
+GAUGE_FRACTIONS = (0.6, 0.8, 1.0)
+GAUGE_COLORS = ('green', 'yellow', 'red')
+
+# Hover templates; fill in {currency} with str.format (Plotly fields use %{{...}})
+PIE_HOVER_TEMPLATE = '<b>%{{label}}</b><br>Amount: {currency} %{{value:,.2f}}<br>Percentage: %{{percent}}<extra></extra>'
+DAILY_HOVER_TEMPLATE = '<b>%{{x}}</b><br>Daily: {currency} %{{y:,.2f}}<extra></extra>'
+TOTAL_HOVER_TEMPLATE = '<b>%{{x}}</b><br>Total: {currency} %{{y:,.2f}}<extra></extra>'
+
+
+def _freeze(value):
+    """Convert dicts and lists (recursively) to tuples so they can be hashed"""
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _fig_cache(func):
+    """
+    Memoize a chart function on its arguments (LRU, FIGURE_CACHE_SIZE entries)
+    
+    Streamlit reruns call the chart functions with the same data on every
+    interaction; cached figures skip rebuilding the Plotly spec. Callers
+    get a shared figure and must not modify it.
+    """
+    cache = OrderedDict()
+    lock = threading.Lock()
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            key = (_freeze(args), _freeze(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+        
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        
+        fig = func(*args, **kwargs)
+        
+        with lock:
+            cache[key] = fig
+            if len(cache) > FIGURE_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return fig
+    
+    return wrapper
+
+
+@_fig_cache
+def create_budget_pie_chart(breakdown: Dict[str, float], currency: str = "USD") -> "go.Figure":
     """
     Create pie chart for budget breakdown
     
@@ -20,6 +96,8 @@ def create_budget_pie_chart(breakdown: Dict[str, float], currency: str = "USD")
     Returns:
         Plotly figure
     """
+    import plotly.graph_objects as go
+    
     labels = list(breakdown.keys())
     values = list(breakdown.values())
     
@@ -27,10 +105,11 @@ def create_budget_pie_chart(breakdown: Dict[str, float], currency: str = "USD")
         labels=labels,
         values=values,
         hole=0.4,
-        marker=dict(colors=['#667eea', '#764ba2', '#f093fb']),
+        marker=dict(colors=PIE_COLORS),
         textposition='inside',
         textinfo='label+percent',
-        hovertemplate='<b>%{label}</b><br>Amount: ' + currency + ' %{value:,.2f}<br>Percentage: %{percent}<extra></extra>'
+        hovertemplate=PIE_HOVER_TEMPLATE.format(currency=currency),
+        **_PLOTLY_OPTIONS
     )])
     
     fig.update_layout(
@@ -48,11 +127,12 @@ def create_budget_pie_chart(breakdown: Dict[str, float], currency: str = "USD")
     return fig
 
 
+@_fig_cache
 def create_daily_vs_total_chart(
     breakdown: Dict[str, float],
     days: int,
     currency: str = "USD"
-) -> go.Figure:
+) -> "go.Figure":
     """
     Create bar chart comparing daily vs total costs
     
@@ -64,9 +144,11 @@ def create_daily_vs_total_chart(
     Returns:
         Plotly figure
     """
+    import plotly.graph_objects as go
+    
     categories = list(breakdown.keys())
-    total_costs = list(breakdown.values())
-    daily_costs = [cost / days for cost in total_costs]
+    total_costs = np.fromiter(breakdown.values(), dtype=np.float64, count=len(breakdown))
+    daily_costs = total_costs / days
     
     fig = go.Figure()
     
@@ -77,7 +159,8 @@ def create_daily_vs_total_chart(
         marker_color='#667eea',
         text=[f'{currency} {val:,.2f}' for val in daily_costs],
         textposition='outside',
-        hovertemplate='<b>%{x}</b><br>Daily: ' + currency + ' %{y:,.2f}<extra></extra>'
+        hovertemplate=DAILY_HOVER_TEMPLATE.format(currency=currency),
+        **_PLOTLY_OPTIONS
     ))
     
     fig.add_trace(go.Bar(
@@ -87,7 +170,8 @@ def create_daily_vs_total_chart(
         marker_color='#764ba2',
         text=[f'{currency} {val:,.2f}' for val in total_costs],
         textposition='outside',
-        hovertemplate='<b>%{x}</b><br>Total: ' + currency + ' %{y:,.2f}<extra></extra>'
+        hovertemplate=TOTAL_HOVER_TEMPLATE.format(currency=currency),
+        **_PLOTLY_OPTIONS
     ))
     
     fig.update_layout(
@@ -136,30 +220,34 @@ def create_line_chart(
     Returns:
         Plotly figure
     """
-    df = pd.DataFrame(data)
+    import plotly.graph_objects as go
     
-    if df.empty:
+    if not data:
         return None
     
-    if color_field:
-        fig = px.line(
-            df,
-            x=x_field,
-            y=y_field,
-            color=color_field,
-            title=title,
-            markers=True
-        )
-    else:
-        fig = px.line(
-            df,
-            x=x_field,
-            y=y_field,
-            title=title,
-            markers=True
-        )
+    # Split rows into one (x, y) series per color group, in first-seen order
+    series = defaultdict(lambda: ([], []))
+    for row in data:
+        xs, ys = series[row[color_field] if color_field else None]
+        xs.append(row[x_field])
+        ys.append(row[y_field])
+    
+    fig = go.Figure()
+    for group, (xs, ys) in series.items():
+        fig.add_trace(go.Scatter(
+            x=xs,
+            y=ys,
+            mode='lines+markers',
+            name=str(group) if color_field else y_field,
+            showlegend=bool(color_field),
+            **_PLOTLY_OPTIONS
+        ))
     
     fig.update_layout(
+        title=title,
+        xaxis_title=x_field,
+        yaxis_title=y_field,
+        legend_title_text=color_field,
         hovermode='x unified',
         height=500
     )
@@ -183,12 +271,15 @@ def create_comparison_chart(
     Returns:
         Plotly figure
     """
+    import plotly.graph_objects as go
+    
     categories = list(actual_data.keys())
     
     # Calculate percentages for actual data
-    total = sum(actual_data.values())
-    actual_pct = [(actual_data[cat] / total * 100) if total > 0 else 0 for cat in categories]
-    recommended_pct = [recommended_data.get(cat, 0) for cat in categories]
+    actual = np.fromiter(actual_data.values(), dtype=np.float64, count=len(categories))
+    total = actual.sum()
+    actual_pct = actual / total * 100 if total > 0 else np.zeros_like(actual)
+    recommended_pct = np.fromiter((recommended_data.get(cat, 0) for cat in categories), dtype=np.float64, count=len(categories))
     
     fig = go.Figure()
     
@@ -198,7 +289,8 @@ def create_comparison_chart(
         y=actual_pct,
         marker_color='rgb(55, 83, 109)',
         text=[f"{val:.1f}%" for val in actual_pct],
-        textposition='outside'
+        textposition='outside',
+        **_PLOTLY_OPTIONS
     ))
     
     fig.add_trace(go.Bar(
@@ -207,7 +299,8 @@ def create_comparison_chart(
         y=recommended_pct,
         marker_color='rgb(26, 118, 255)',
         text=[f"{val:.1f}%" for val in recommended_pct],
-        textposition='outside'
+        textposition='outside',
+        **_PLOTLY_OPTIONS
     ))
     
     fig.update_layout(
@@ -222,6 +315,7 @@ def create_comparison_chart(
     return fig
 
 
+@_fig_cache
 def create_gauge_chart(
     value: float,
     max_value: float,
@@ -240,13 +334,19 @@ def create_gauge_chart(
     Returns:
         Plotly figure
     """
+    import plotly.graph_objects as go
+    
     if thresholds is None:
-        thresholds = {
-            'values': [max_value * 0.6, max_value * 0.8, max_value],
-            'colors': ['green', 'yellow', 'red']
-        }
+        edges = [max_value * fraction for fraction in GAUGE_FRACTIONS]
+        colors = GAUGE_COLORS
+    else:
+        edges, colors = thresholds['values'], thresholds['colors']
     
-    percentage = (value / max_value * 100) if max_value > 0 else 0
+    # One step per band: [0, edge1], [edge1, edge2], ...
+    steps = [
+        {'range': [low, high], 'color': color}
+        for low, high, color in zip([0, *edges], edges, colors)
+    ]
     
     fig = go.Figure(go.Indicator(
         mode="gauge+number+delta",
@@ -257,17 +357,14 @@ def create_gauge_chart(
         gauge={
             'axis': {'range': [None, max_value]},
             'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, thresholds['values'][0]], 'color': thresholds['colors'][0]},
-                {'range': [thresholds['values'][0], thresholds['values'][1]], 'color': thresholds['colors'][1]},
-                {'range': [thresholds['values'][1], thresholds['values'][2]], 'color': thresholds['colors'][2]}
-            ],
+            'steps': steps,
             'threshold': {
                 'line': {'color': "red", 'width': 4},
                 'thickness': 0.75,
                 'value': max_value
             }
-        }
+        },
+        **_PLOTLY_OPTIONS
     ))
     
     fig.update_layout(height=400)
@@ -275,6 +372,7 @@ def create_gauge_chart(
     return fig
 
 
+@_fig_cache
 def create_sunburst_chart(
     data: Dict[str, float],
     title: str = "Budget Hierarchy"
@@ -289,10 +387,13 @@ def create_sunburst_chart(
     Returns:
         Plotly figure
     """
+    import plotly.express as px
+    
     # Prepare data for sunburst
-    labels = ["Total"] + list(data.keys())
-    parents = [""] + ["Total"] * len(data)
-    values = [sum(data.values())] + list(data.values())
+    amounts = list(data.values())
+    labels = ["Total", *data]
+    parents = [""] + ["Total"] * len(amounts)
+    values = [math.fsum(amounts), *amounts]
     
     fig = px.sunburst(
         names=labels,
@@ -4,49 +4,106 @@ Handles real-time exchange rates and currency operations
 """
 
 import requests
-from typing import Dict, List, Optional
-from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config.secrets_manager import EXCHANGERATE_API_KEY
 
 API_BASE_URL = "https://api.exchangerate.host"
 API_KEY = EXCHANGERATE_API_KEY  # Works for both local and cloud
 
+# Shared HTTP session so connections (and TLS handshakes) are reused across calls
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    # Retry failed connects only: retrying read timeouts would multiply the wait
+    max_retries=Retry(total=2, read=0, backoff_factor=0.2)
+))
 
-def get_supported_currencies() -> List[str]:
+
+# Currency code -> full name
+CURRENCY_NAMES = {
+    "USD": "US Dollar", "EUR": "Euro", "GBP": "British Pound", "JPY": "Japanese Yen",
+    "AUD": "Australian Dollar", "CAD": "Canadian Dollar", "CHF": "Swiss Franc",
+    "CNY": "Chinese Yuan", "SEK": "Swedish Krona", "NZD": "New Zealand Dollar",
+    "MXN": "Mexican Peso", "SGD": "Singapore Dollar", "HKD": "Hong Kong Dollar",
+    "NOK": "Norwegian Krone", "KRW": "South Korean Won", "TRY": "Turkish Lira",
+    "RUB": "Russian Ruble", "INR": "Indian Rupee", "BRL": "Brazilian Real",
+    "ZAR": "South African Rand", "DKK": "Danish Krone", "PLN": "Polish Zloty",
+    "TWD": "Taiwan Dollar", "THB": "Thai Baht", "MYR": "Malaysian Ringgit",
+    "IDR": "Indonesian Rupiah", "HUF": "Hungarian Forint", "CZK": "Czech Koruna",
+    "ILS": "Israeli Shekel", "CLP": "Chilean Peso", "PHP": "Philippine Peso",
+    "AED": "UAE Dirham", "SAR": "Saudi Riyal", "COP": "Colombian Peso",
+    "ARS": "Argentine Peso", "PKR": "Pakistani Rupee", "BDT": "Bangladeshi Taka",
+    "VND": "Vietnamese Dong", "EGP": "Egyptian Pound", "NGN": "Nigerian Naira"
+}
+
+# Supported currency codes, sorted
+SUPPORTED_CURRENCIES = tuple(sorted(CURRENCY_NAMES))
+
+
+def get_supported_currencies() -> Tuple[str, ...]:
     """Get list of supported currency codes"""
-    currencies = [
-        "USD", "EUR", "GBP", "JPY", "AUD", "CAD", "CHF", "CNY", "SEK", "NZD",
-        "MXN", "SGD", "HKD", "NOK", "KRW", "TRY", "RUB", "INR", "BRL", "ZAR",
-        "DKK", "PLN", "TWD", "THB", "MYR", "IDR", "HUF", "CZK", "ILS", "CLP",
-        "PHP", "AED", "SAR", "COP", "ARS", "PKR", "BDT", "VND", "EGP", "NGN"
-    ]
-    return sorted(currencies)
+    return SUPPORTED_CURRENCIES
 
 
 def get_currency_name(code: str) -> str:
     """Get full currency name from code"""
-    names = {
-        "USD": "US Dollar", "EUR": "Euro", "GBP": "British Pound", "JPY": "Japanese Yen",
-        "AUD": "Australian Dollar", "CAD": "Canadian Dollar", "CHF": "Swiss Franc",
-        "CNY": "Chinese Yuan", "SEK": "Swedish Krona", "NZD": "New Zealand Dollar",
-        "MXN": "Mexican Peso", "SGD": "Singapore Dollar", "HKD": "Hong Kong Dollar",
-        "NOK": "Norwegian Krone", "KRW": "South Korean Won", "TRY": "Turkish Lira",
-        "RUB": "Russian Ruble", "INR": "Indian Rupee", "BRL": "Brazilian Real",
-        "ZAR": "South African Rand", "DKK": "Danish Krone", "PLN": "Polish Zloty",
-        "TWD": "Taiwan Dollar", "THB": "Thai Baht", "MYR": "Malaysian Ringgit",
-        "IDR": "Indonesian Rupiah", "HUF": "Hungarian Forint", "CZK": "Czech Koruna",
-        "ILS": "Israeli Shekel", "CLP": "Chilean Peso", "PHP": "Philippine Peso",
-        "AED": "UAE Dirham", "SAR": "Saudi Riyal", "COP": "Colombian Peso",
-        "ARS": "Argentine Peso", "PKR": "Pakistani Rupee", "BDT": "Bangladeshi Taka",
-        "VND": "Vietnamese Dong", "EGP": "Egyptian Pound", "NGN": "Nigerian Naira"
-    }
-    return names.get(code, code)
+    return CURRENCY_NAMES.get(code, code)
+
+
+@lru_cache(maxsize=1)
+def _get_usd_rates(hour_key: str) -> Tuple[Dict[str, float], Optional[str]]:
+    """
+    Fetch all USD exchange rates in one request (cached per hour)
+    
+    The free exchangerate.host plan only serves USD-based quotes, so
+    other pairs are computed as cross rates from these.
+    
+    Args:
+        hour_key: Current UTC hour (e.g. "2024-05-01-13"); a new hour means
+            a new cache key, so rates refresh hourly
+        
+    Returns:
+        Tuple of (currency -> units per 1 USD, rate date)
+        
+    Raises:
+        ValueError: If the rates could not be fetched (failures are not cached)
+    """
+    params = {}
+    
+    # Add API key if available
+    if API_KEY:
+        params["access_key"] = API_KEY
+    
+    # (connect, read) timeouts: fail fast when the API is unreachable
+    response = _SESSION.get(f"{API_BASE_URL}/live", params=params, timeout=(3.05, 10))
+    
+    data = response.json() if response.status_code == 200 else {}
+    if not data.get("success"):
+        raise ValueError("Could not fetch exchange rates")
+    
+    # Quotes are keyed by currency pair, e.g. "USDEUR"
+    rates = {pair[3:]: rate for pair, rate in data.get("quotes", {}).items() if pair.startswith("USD")}
+    rates["USD"] = 1.0
+    
+    date = None
+    if data.get("timestamp"):
+        date = datetime.fromtimestamp(data["timestamp"], timezone.utc).strftime("%Y-%m-%d")
+    
+    return rates, date
 
 
 def convert_currency(amount: float, from_currency: str, to_currency: str) -> Optional[Dict]:
     """
     Convert amount from one currency to another using exchangerate.host API
     
+    USD rates are fetched once per hour and other pairs are cross rates,
+    so repeat conversions are local arithmetic.
+    
     Args:
         amount: Amount to convert
         from_currency: Source currency code
@@ -56,36 +113,42 @@ def convert_currency(amount: float, from_currency: str, to_currency: str) -> Opt
         Dictionary with conversion result or None
     """
     try:
-        url = f"{API_BASE_URL}/convert"
-        params = {
-            "from": from_currency,
-            "to": to_currency,
-            "amount": amount
-        }
+        hour_key = datetime.now(timezone.utc).strftime("%Y-%m-%d-%H")
+        rates, date = _get_usd_rates(hour_key)
         
-        # Add API key if available
-        if API_KEY:
-            params["access_key"] = API_KEY
+        from_rate = rates.get(from_currency)
+        to_rate = rates.get(to_currency)
+        if not from_rate or to_rate is None:
+            return None
         
-        response = requests.get(url, params=params, timeout=10)
+        rate = to_rate / from_rate
         
-        if response.status_code == 200:
-            data = response.json()
-            
-            if data.get("success"):
-                converted_amount = data.get("result")
-                # Calculate rate from result
-                rate = converted_amount / amount if amount > 0 else None
-                
-                return {
-                    "converted_amount": converted_amount,
-                    "rate": rate,
-                    "from": from_currency,
-                    "to": to_currency,
-                    "date": data.get("date"),
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+        return {
+            "converted_amount": amount * rate,
+            "rate": rate,
+            "from": from_currency,
+            "to": to_currency,
+            "date": date,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
     except Exception as e:
         print(f"Error converting currency: {e}")
     
     return None
+
+
+def convert_currency_many(pairs: List[Tuple[float, str, str]]) -> List[Optional[Dict]]:
+    """
+    Convert several amounts at once
+    
+    All pairs share the hourly USD rates, so N conversions cost at most
+    one request.
+    
+    Args:
+        pairs: List of (amount, from_currency, to_currency) tuples
+        
+    Returns:
+        List of conversion results (or None), in the same order as pairs
+    """
+    return [convert_currency(amount, from_currency, to_currency)
+            for amount, from_currency, to_currency in pairs]
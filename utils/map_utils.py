@@ -4,10 +4,68 @@ Handles map creation and location services
 """
 
 import folium
+import numpy as np
+import orjson
+from folium.plugins import MarkerCluster
+from math import radians, sin, cos, sqrt, asin
 import requests
+import string
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+from geopy.extra.rate_limiter import RateLimiter
+
+# Earth's radius in kilometers (Haversine distances)
+EARTH_RADIUS_KM = 6371.0
+
+# Above this many markers, add_markers clusters them
+MARKER_CLUSTER_THRESHOLD = 50
+
+# Most Geoapify searches get_places_many runs at once
+MAX_PLACES_WORKERS = 8
+
+# get_places returns up to this many tourism places, plus other places
+MAX_TOURISM_PLACES = 15
+MAX_OTHER_PLACES = 5
+
+# Strips punctuation from place names, so "St. Peter's" and "St Peters" match
+_PUNCT_TABLE = str.maketrans("", "", string.punctuation)
+
+# add_route drops points that deviate less than this from the drawn line
+ROUTE_TOLERANCE_M = 20.0
+
+# Shared HTTP session for Geoapify so the geocode and places calls (and any
+# later searches) reuse one kept-alive connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    # Retry failed connects only: retrying read timeouts would multiply the wait
+    max_retries=Retry(total=2, read=0, backoff_factor=0.2)
+))
+
+# Shared geocoder; Nominatim allows at most one request per second
+_GEOCODER = Nominatim(user_agent="travel_budget_planner", timeout=10)
+_geocode = RateLimiter(_GEOCODER.geocode, min_delay_seconds=1, max_retries=0, swallow_exceptions=False)
+_reverse = RateLimiter(_GEOCODER.reverse, min_delay_seconds=1, max_retries=0, swallow_exceptions=False)
+
+
+@lru_cache(maxsize=4096)
+def _geocode_cached(location_name: str) -> Optional[Tuple[float, float]]:
+    """Geocode a name (errors propagate, so only real answers are cached)"""
+    location = _geocode(location_name)
+    return (location.latitude, location.longitude) if location else None
+
+
+@lru_cache(maxsize=4096)
+def _reverse_geocode_cached(lat: float, lon: float) -> Optional[str]:
+    """Reverse geocode a point (errors propagate, so only real answers are cached)"""
+    location = _reverse(f"{lat}, {lon}")
+    return location.address if location else None
 
 
 def create_base_map(
@@ -51,20 +109,111 @@ def add_markers(
     Returns:
         Updated map object
     """
-    for loc in locations:
+    return add_markers_soa(
+        map_obj,
+        lats=[loc["lat"] for loc in locations],
+        lons=[loc["lon"] for loc in locations],
+        names=[loc["name"] for loc in locations],
+        infos=[loc.get("info", loc["name"]) for loc in locations],
+        icon_color=icon_color
+    )
+
+
+def add_markers_soa(
+    map_obj: folium.Map,
+    lats,
+    lons,
+    names: List[str],
+    infos: Optional[List[str]] = None,
+    icon_color: str = "blue"
+) -> folium.Map:
+    """
+    Add markers to a map from parallel columns (lists or NumPy arrays)
+    
+    Markers go into one layer that is attached to the map once; more than
+    MARKER_CLUSTER_THRESHOLD markers are clustered.
+    
+    Args:
+        map_obj: Folium map object
+        lats: Marker latitudes
+        lons: Marker longitudes
+        names: Marker names (tooltips)
+        infos: Popup contents (markers whose info is just the name get no popup)
+        icon_color: Marker color
+        
+    Returns:
+        Updated map object
+    """
+    if len(names) > MARKER_CLUSTER_THRESHOLD:
+        layer = MarkerCluster(name="markers")
+    else:
+        layer = folium.FeatureGroup(name="markers")
+    
+    # folium needs a fresh Icon per marker, but the options are the same
+    icon_options = {"color": icon_color, "icon": "info-sign"}
+    
+    for lat, lon, name, info in zip(lats, lons, names, names if infos is None else infos):
         folium.Marker(
-            location=[loc["lat"], loc["lon"]],
-            popup=folium.Popup(loc.get("info", loc["name"]), max_width=300),
-            tooltip=loc["name"],
-            icon=folium.Icon(color=icon_color, icon="info-sign")
-        ).add_to(map_obj)
+            location=[float(lat), float(lon)],
+            # A popup repeating the tooltip is redundant HTML
+            popup=folium.Popup(info, max_width=300) if info != name else None,
+            tooltip=name,
+            icon=folium.Icon(**icon_options)
+        ).add_to(layer)
+    
+    layer.add_to(map_obj)
     
     return map_obj
 
 
+@lru_cache(maxsize=64)
+def _render_map_html(
+    center: Tuple[float, float],
+    zoom: int,
+    places: Tuple[Tuple[float, float, str, str], ...],
+    icon_color: str
+) -> str:
+    """Build a marker map and render it to HTML (cached by its inputs)"""
+    map_obj = create_base_map(list(center), zoom)
+    if places:
+        lats, lons, names, infos = zip(*places)
+        add_markers_soa(map_obj, lats, lons, names, infos, icon_color)
+    
+    return map_obj.get_root().render()
+
+
+def render_map_html(
+    center: List[float],
+    locations: List[Dict],
+    zoom: int = 10,
+    icon_color: str = "blue"
+) -> str:
+    """
+    Render a map with location markers to HTML
+    
+    The same center, zoom and set of locations returns the cached HTML
+    instead of re-running folium's templates.
+    
+    Args:
+        center: [latitude, longitude]
+        locations: List of location dictionaries with 'lat', 'lon', 'name', 'info'
+        zoom: Initial zoom level
+        icon_color: Marker color
+        
+    Returns:
+        Map HTML
+    """
+    places = tuple(sorted(
+        (float(loc["lat"]), float(loc["lon"]), loc["name"], loc.get("info", loc["name"]))
+        for loc in locations
+    ))
+    
+    return _render_map_html((float(center[0]), float(center[1])), zoom, places, icon_color)
+
+
 def geocode_location(location_name: str) -> Optional[Tuple[float, float]]:
     """
-    Convert location name to coordinates
+    Convert location name to coordinates (results are cached)
     
     Args:
         location_name: Name of location (city, country, address)
@@ -73,20 +222,31 @@ def geocode_location(location_name: str) -> Optional[Tuple[float, float]]:
         Tuple of (latitude, longitude) or None
     """
     try:
-        geolocator = Nominatim(user_agent="travel_budget_planner")
-        location = geolocator.geocode(location_name, timeout=10)
-        
-        if location:
-            return (location.latitude, location.longitude)
+        return _geocode_cached(location_name)
     except (GeocoderTimedOut, GeocoderServiceError):
-        pass
+        return None
+
+
+def geocode_many(location_names: List[str]) -> List[Optional[Tuple[float, float]]]:
+    """
+    Convert several location names to coordinates
+    
+    Nominatim allows one request per second, so lookups run one after
+    another; each distinct name is requested at most once.
     
-    return None
+    Args:
+        location_names: Names of locations
+        
+    Returns:
+        List of (latitude, longitude) tuples or None, in the same order
+    """
+    results = {name: geocode_location(name) for name in dict.fromkeys(location_names)}
+    return [results[name] for name in location_names]
 
 
 def reverse_geocode(lat: float, lon: float) -> Optional[str]:
     """
-    Convert coordinates to location name
+    Convert coordinates to location name (results are cached per ~10 m)
     
     Args:
         lat: Latitude
@@ -96,130 +256,167 @@ def reverse_geocode(lat: float, lon: float) -> Optional[str]:
         Location name or None
     """
     try:
-        geolocator = Nominatim(user_agent="travel_budget_planner")
-        location = geolocator.reverse(f"{lat}, {lon}", timeout=10)
-        
-        if location:
-            return location.address
+        # Round to ~10 m so nearby points share a cache entry
+        return _reverse_geocode_cached(round(lat, 4), round(lon, 4))
     except (GeocoderTimedOut, GeocoderServiceError):
-        pass
+        return None
+
+
+@lru_cache(maxsize=256)
+def _geoapify_geocode_cached(city: str, api_key: str) -> Optional[Tuple[float, float]]:
+    """Geocode a city with Geoapify (errors propagate, so only real answers are cached)"""
+    geocode_url = "https://api.geoapify.com/v1/geocode/search"
+    geocode_params = {
+        "text": city,
+        "apiKey": api_key,
+        "limit": 1
+    }
+    
+    geo_response = _SESSION.get(geocode_url, params=geocode_params, timeout=30)
+    geo_response.raise_for_status()
+    
+    geo_data = orjson.loads(geo_response.content)
+    
+    if not geo_data.get("features"):
+        return None
+    
+    lon, lat = geo_data["features"][0]["geometry"]["coordinates"][:2]
+    return lat, lon
+
+
+@lru_cache(maxsize=256)
+def _get_places_cached(lat: float, lon: float, api_key: str) -> Dict:
+    """Fetch places around a point (errors propagate, so only real answers are cached)"""
+    # Fetch places with larger radius and limit
+    places_url = "https://api.geoapify.com/v2/places"
+    places_params = {
+        "categories": "tourism,heritage,entertainment.museum,tourism.attraction,tourism.sights,entertainment.culture",
+        "filter": f"circle:{lon},{lat},10000",
+        # Nearest places first, with English names
+        "bias": f"proximity:{lon},{lat}",
+        "lang": "en",
+        "limit": 40,
+        "apiKey": api_key
+    }
+    
+    places_response = _SESSION.get(places_url, params=places_params, timeout=30)
+    places_response.raise_for_status()
+    
+    places_data = orjson.loads(places_response.content)
+    
+    if not places_data.get("features"):
+        return {"center": [lat, lon], "places": []}
+    
+    # Parse places straight into the two priority groups
+    tourism_places = []
+    other_places = []
+    seen_names = set()
+    
+    for feature in places_data["features"]:
+        props = feature.get("properties", {})
+        coords = feature.get("geometry", {}).get("coordinates", [0, 0])
+        name = props.get("name", "Unknown Place")
+        
+        # Remove duplicates, ignoring case and punctuation
+        name_key = name.casefold().translate(_PUNCT_TABLE).strip()
+        if name_key in seen_names:
+            continue
+        seen_names.add(name_key)
+        
+        categories = props.get("categories", ["tourism"])
+        main_category = categories[0] if categories else "tourism"
+        
+        # Prioritize tourism categories
+        is_tourism = "tourism" in main_category or "attraction" in main_category
+        group = tourism_places if is_tourism else other_places
+        
+        group.append({
+            "name": name,
+            "lat": coords[1],
+            "lon": coords[0],
+            "address": props.get("formatted", "Address not available"),
+            "category": main_category,
+            "description": props.get("description", ""),
+            "website": props.get("datasource", {}).get("raw", {}).get("website", "")
+        })
+        
+        # Both groups full: later features can't be selected
+        if len(tourism_places) >= MAX_TOURISM_PLACES and len(other_places) >= MAX_OTHER_PLACES:
+            break
     
-    return None
+    # Tourism places first, then a few others
+    selected = tourism_places[:MAX_TOURISM_PLACES] + other_places[:MAX_OTHER_PLACES]
+    
+    return {
+        "center": [lat, lon],
+        "places": selected
+    }
 
 
-def get_places(city: str, api_key: str) -> Optional[Dict]:
+def get_places(
+    city: str,
+    api_key: str,
+    center: Optional[Tuple[float, float]] = None
+) -> Optional[Dict]:
     """
     Fetch tourist places from Geoapify Places API with enhanced data
     
+    Geocoding and places results are cached, so repeat searches skip
+    both API calls. Passing a known center skips the geocode call.
+    
     Args:
         city: City name to search
         api_key: Geoapify API key
+        center: Optional (latitude, longitude) of the city, if already known
         
     Returns:
         Dict with center coordinates and list of places
     """
-    import random
-    
     if not api_key:
         return None
+    
+    # Strip once so " Paris" and "Paris" share a cache entry
+    city = city.strip() if city else ""
+    if center is None and not city:
+        return None
         
     try:
-        # First, geocode the city to get coordinates
-        geocode_url = "https://api.geoapify.com/v1/geocode/search"
-        geocode_params = {
-            "text": city,
-            "apiKey": api_key,
-            "limit": 1
-        }
-        
-        geo_response = requests.get(geocode_url, params=geocode_params, timeout=30)
-        
-        if geo_response.status_code != 200:
-            return None
-            
-        geo_data = geo_response.json()
-        
-        if not geo_data.get("features"):
-            return None
-            
-        coordinates = geo_data["features"][0]["geometry"]["coordinates"]
-        lon, lat = coordinates[0], coordinates[1]
-        
-        # Fetch places with larger radius and limit
-        places_url = "https://api.geoapify.com/v2/places"
-        places_params = {
-            "categories": "tourism,heritage,entertainment.museum,tourism.attraction,tourism.sights,entertainment.culture",
-            "filter": f"circle:{lon},{lat},10000",
-            "limit": 40,
-            "apiKey": api_key
-        }
-        
-        places_response = requests.get(places_url, params=places_params, timeout=30)
-        
-        if places_response.status_code != 200:
-            return None
-            
-        places_data = places_response.json()
-        
-        if not places_data.get("features"):
-            return {"center": [lat, lon], "places": []}
-            
-        # Parse places
-        all_places = []
-        seen_names = set()
-        
-        for feature in places_data["features"]:
-            props = feature.get("properties", {})
-            coords = feature.get("geometry", {}).get("coordinates", [0, 0])
-            name = props.get("name", "Unknown Place")
-            
-            # Remove duplicates
-            if name in seen_names:
-                continue
-            seen_names.add(name)
-            
-            categories = props.get("categories", ["tourism"])
-            main_category = categories[0] if categories else "tourism"
-            
-            # Prioritize tourism categories
-            is_tourism = "tourism" in main_category or "attraction" in main_category
-            
-            place = {
-                "name": name,
-                "lat": coords[1],
-                "lon": coords[0],
-                "address": props.get("formatted", "Address not available"),
-                "category": main_category,
-                "description": props.get("description", ""),
-                "website": props.get("datasource", {}).get("raw", {}).get("website", ""),
-                "priority": 1 if is_tourism else 0
-            }
-            all_places.append(place)
-        
-        # Sort by priority and randomly select 20
-        all_places.sort(key=lambda x: x["priority"], reverse=True)
-        tourism_places = [p for p in all_places if p["priority"] == 1]
-        other_places = [p for p in all_places if p["priority"] == 0]
-        
-        # Take up to 15 tourism places and up to 5 others
-        selected = tourism_places[:15] + other_places[:5]
-        
-        # If we have more than 20, randomly sample
-        if len(selected) > 20:
-            selected = random.sample(selected, 20)
-        
-        # Remove priority field from final result
-        for place in selected:
-            place.pop("priority", None)
-            
-        return {
-            "center": [lat, lon],
-            "places": selected
-        }
+        if center is None:
+            center = _geoapify_geocode_cached(city, api_key)
+            if center is None:
+                return None
         
+        result = _get_places_cached(float(center[0]), float(center[1]), api_key)
     except Exception as e:
         print(f"Error fetching places: {e}")
         return None
+    
+    # Copy so callers can't modify the cached result
+    return {
+        "center": list(result["center"]),
+        "places": [dict(place) for place in result["places"]]
+    }
+
+
+def get_places_many(cities: List[str], api_key: str) -> List[Optional[Dict]]:
+    """
+    Fetch tourist places for several cities concurrently
+    
+    Each city still needs its geocode call before its places call, but
+    different cities are searched in parallel over the shared session.
+    
+    Args:
+        cities: City names to search
+        api_key: Geoapify API key
+        
+    Returns:
+        List of get_places results, in the same order as cities
+    """
+    if not api_key or not cities:
+        return [None] * len(cities)
+    
+    with ThreadPoolExecutor(max_workers=min(len(cities), MAX_PLACES_WORKERS)) as pool:
+        return list(pool.map(get_places, cities, [api_key] * len(cities)))
 
 
 def search_attractions(
@@ -270,50 +467,204 @@ def calculate_distance(
     Returns:
         Distance in kilometers
     """
-    from math import radians, sin, cos, sqrt, atan2
-    
     lat1, lon1 = point1
     lat2, lon2 = point2
     
-    # Earth's radius in kilometers
-    R = 6371.0
-    
     # Convert to radians
     lat1_rad = radians(lat1)
-    lon1_rad = radians(lon1)
     lat2_rad = radians(lat2)
-    lon2_rad = radians(lon2)
     
     # Haversine formula
     dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
+    dlon = radians(lon2 - lon1)
     
     a = sin(dlat / 2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    c = 2 * asin(sqrt(a))
+    
+    return EARTH_RADIUS_KM * c
+
+
+def calculate_distance_fast(
+    point1: Tuple[float, float],
+    point2: Tuple[float, float]
+) -> float:
+    """
+    Approximate distance between two nearby points (equirectangular)
+    
+    Within a city (tens of km) this is within about 0.5% of
+    calculate_distance, at a fraction of the trig work; use
+    calculate_distance for long distances.
+    
+    Args:
+        point1: (latitude, longitude) of first point
+        point2: (latitude, longitude) of second point
+        
+    Returns:
+        Distance in kilometers
+    """
+    lat1, lon1 = point1
+    lat2, lon2 = point2
+    
+    # Wrap the longitude difference into [-180, 180) so points either side of ±180° stay close
+    x = radians((lon2 - lon1 + 180) % 360 - 180) * cos(radians((lat1 + lat2) / 2))
+    y = radians(lat2 - lat1)
+    
+    return EARTH_RADIUS_KM * sqrt(x * x + y * y)
+
+
+def precompute_point(lat: float, lon: float) -> Tuple[float, float, float]:
+    """
+    Precompute the trig terms of a point reused against many others
+    
+    Args:
+        lat: Latitude
+        lon: Longitude
+        
+    Returns:
+        (lat_rad, lon_rad, cos_lat) for use with distance_from
+    """
+    lat_rad = radians(lat)
+    return lat_rad, radians(lon), cos(lat_rad)
+
+
+def distance_from(pre: Tuple[float, float, float], lat2: float, lon2: float) -> float:
+    """
+    Haversine distance from a precomputed point, e.g. a hub to many targets
+    
+    Args:
+        pre: Result of precompute_point for the first point
+        lat2: Latitude of second point
+        lon2: Longitude of second point
+        
+    Returns:
+        Distance in kilometers
+    """
+    lat1_rad, lon1_rad, cos_lat1 = pre
+    lat2_rad = radians(lat2)
+    
+    a = (sin((lat2_rad - lat1_rad) / 2)**2
+         + cos_lat1 * cos(lat2_rad) * sin((radians(lon2) - lon1_rad) / 2)**2)
+    c = 2 * asin(sqrt(a))
+    
+    return EARTH_RADIUS_KM * c
+
+
+def calculate_distances(points1, points2) -> np.ndarray:
+    """
+    Calculate distances between many pairs of points using Haversine formula
+    
+    Vectorized counterpart of calculate_distance, e.g. for all legs of a
+    route: calculate_distances(waypoints[:-1], waypoints[1:]). Either
+    side may be a single (latitude, longitude) point, which is broadcast:
+    calculate_distances(origin, places) ranks places by distance.
+    
+    Args:
+        points1: Array-like of shape (N, 2) or (2,) with (latitude, longitude) rows
+        points2: Array-like of shape (N, 2) or (2,) with (latitude, longitude) rows
+        
+    Returns:
+        Array of N distances in kilometers
+    """
+    points1 = np.radians(np.asarray(points1, dtype=np.float64))
+    points2 = np.radians(np.asarray(points2, dtype=np.float64))
+    
+    lat1, lon1 = points1[..., 0], points1[..., 1]
+    lat2, lon2 = points2[..., 0], points2[..., 1]
+    
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    
+    a = np.sin(dlat / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    
+    return EARTH_RADIUS_KM * c
+
+
+def calculate_distance_matrix(points1, points2=None) -> np.ndarray:
+    """
+    Calculate the distance between every pair of points (like scipy's cdist)
+    
+    Useful for ordering places into a route, e.g. nearest-neighbour.
+    
+    Args:
+        points1: Array-like of shape (N, 2) with (latitude, longitude) rows
+        points2: Array-like of shape (M, 2); defaults to points1
+        
+    Returns:
+        Array of shape (N, M) with distances in kilometers
+    """
+    points1 = np.asarray(points1, dtype=np.float64)
+    points2 = points1 if points2 is None else np.asarray(points2, dtype=np.float64)
+    
+    return calculate_distances(points1[:, None, :], points2[None, :, :])
+
+
+def _simplify_route(waypoints, tolerance_m: float) -> List[List[float]]:
+    """Ramer-Douglas-Peucker: keep only points that bend the line by more than tolerance_m"""
+    points = np.asarray(waypoints, dtype=np.float64)
+    n = len(points)
     
-    distance = R * c
+    # Project to local metres (equirectangular is accurate enough at route scale).
+    # Unwrap longitudes first so a route crossing ±180° stays continuous.
+    lat_rad = np.radians(points[:, 0])
+    lon_rad = np.radians(np.unwrap(points[:, 1], period=360))
+    xy = np.column_stack((lon_rad * np.cos(lat_rad.mean()), lat_rad))
+    xy *= EARTH_RADIUS_KM * 1000
     
-    return distance
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        
+        # Distance of the inner points from the line start -> end
+        dx, dy = xy[end] - xy[start]
+        rel = xy[start + 1:end] - xy[start]
+        length = np.hypot(dx, dy)
+        if length > 0:
+            dist = np.abs(dx * rel[:, 1] - dy * rel[:, 0]) / length
+        else:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        
+        i = int(dist.argmax())
+        if dist[i] > tolerance_m:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack += [(start, mid), (mid, end)]
+    
+    return points[keep].tolist()
 
 
 def add_route(
     map_obj: folium.Map,
     waypoints: List[Tuple[float, float]],
     color: str = "blue",
-    weight: int = 5
+    weight: int = 5,
+    tolerance_m: float = ROUTE_TOLERANCE_M
 ) -> folium.Map:
     """
     Add a route line between waypoints
     
+    Long routes (e.g. GPS tracks) are simplified first, so the page only
+    carries the points that visibly change the line.
+    
     Args:
         map_obj: Folium map object
         waypoints: List of (latitude, longitude) tuples
         color: Line color
         weight: Line thickness
+        tolerance_m: Simplification tolerance in metres (0 keeps every point)
         
     Returns:
         Updated map object
     """
+    if tolerance_m > 0 and len(waypoints) > 2:
+        waypoints = _simplify_route(waypoints, tolerance_m)
+    
     folium.PolyLine(
         locations=waypoints,
         color=color,